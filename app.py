@@ -1,13 +1,25 @@
 
+import atexit
+import ctypes
+import ctypes.util
+import functools
+import gc
+import logging
+import math
 import os
+import queue
+import random
+import shutil
+import signal
+import subprocess
 import sys
 import threading
 import time
 import json
 from datetime import datetime
 
-import pygame
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, Response, abort, render_template, request, jsonify, send_file
+from flask.json.provider import DefaultJSONProvider
 
 # GPIO imports - only import if available (for non-Pi systems)
 try:
@@ -17,20 +29,98 @@ except ImportError:
     GPIO_AVAILABLE = False
     print("Warning: GPIO not available. Running in simulation mode.")
 
+# pygame - only needed for the 'pygame' audio backend
+# SDL would otherwise install its own SIGTERM handler, which swallows a service stop
+os.environ.setdefault('SDL_NO_SIGNAL_HANDLERS', '1')
+try:
+    import pygame
+    PYGAME_AVAILABLE = True
+except ImportError:
+    PYGAME_AVAILABLE = False
+
+# Faster JSON - optional, falls back to the stdlib json module
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Production WSGI server - optional, falls back to the Flask dev server
+try:
+    from waitress import serve
+    WAITRESS_AVAILABLE = True
+except ImportError:
+    WAITRESS_AVAILABLE = False
+
 from config import Config
 
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
 app.config.from_object(Config)
+if ORJSON_AVAILABLE:
+    app.json = ORJSONProvider(app)
+
+# Must run before any thread starts: mlockall(MCL_FUTURE) would otherwise pin the default 8 MiB stack of each one
+# (threads started in C, such as SDL's audio thread, keep the default size)
+if app.config['THREAD_STACK_SIZE']:
+    threading.stack_size(app.config['THREAD_STACK_SIZE'])
+
+# Per-poll and per-event trace output; silent unless logging is configured (DEBUG = True)
+status_log = logging.getLogger('lugerelay.status')
+status_log.addHandler(logging.NullHandler())
+
+# Sequence milestones (INFO) and problems (WARNING/ERROR)
+sequence_log = logging.getLogger('lugerelay.sequence')
 
 # Settings file path
 SETTINGS_FILE = 'settings.json'
+SETTINGS_SAVE_DELAY = 0.5  # Seconds to coalesce rapid settings changes into one write
+
+# Settings persisted to SETTINGS_FILE and editable via /save_settings (lowercase keys), with their types
+PERSISTED_SETTINGS = {
+    'HOST': str,
+    'PORT': int,
+    'DEBUG': bool,
+    'DEFAULT_DELAY1': float,
+    'DEFAULT_DELAY2': float,
+    'MIN_TOTAL_TIME': float,
+    'MAX_TOTAL_TIME': float,
+    'AUDIO_VOLUME': float,
+    'AUDIO_BUFFER': int,
+    'AUTO_REFRESH_INTERVAL': int,
+    'COUNTDOWN_UPDATE_INTERVAL': int,
+    'RELAY_PIN': int,
+    'RELAY_ACTIVE_HIGH': bool,
+    'GATE_OPEN_DURATION': float,
+    'BEEP_RELAY_ALIGNMENT': float,
+}
+
+# Debounced settings writes
+_save_lock = threading.Lock()
+_save_timer = None
+_last_saved_settings = None  # JSON text last read from / written to SETTINGS_FILE
+
+# Serialized /get_settings body, rebuilt on the first read after a settings change
+_settings_response = None
+_settings_generation = 0  # Bumped on every settings change; a body built across a change is not cached
 
 def load_settings_from_file():
     """Load settings from JSON file"""
+    global _last_saved_settings
     try:
         if os.path.exists(SETTINGS_FILE):
             with open(SETTINGS_FILE, 'r') as f:
-                settings = json.load(f)
+                content = f.read()
+                settings = app.json.loads(content)
+                _last_saved_settings = content
                 # Update app config with loaded settings
                 for key, value in settings.items():
                     if key in app.config:
@@ -42,105 +132,219 @@ def load_settings_from_file():
     return False
 
 def save_settings_to_file():
-    """Save current settings to JSON file"""
+    """Save current settings to JSON file (skipped if nothing changed)"""
+    global _last_saved_settings
     try:
-        settings = {
-            'HOST': app.config['HOST'],
-            'PORT': app.config['PORT'],
-            'DEBUG': app.config['DEBUG'],
-            'DEFAULT_DELAY1': app.config['DEFAULT_DELAY1'],
-            'DEFAULT_DELAY2': app.config['DEFAULT_DELAY2'],
-            'MIN_TOTAL_TIME': app.config['MIN_TOTAL_TIME'],
-            'MAX_TOTAL_TIME': app.config['MAX_TOTAL_TIME'],
-            'AUDIO_VOLUME': app.config['AUDIO_VOLUME'],
-            'AUTO_REFRESH_INTERVAL': app.config['AUTO_REFRESH_INTERVAL'],
-            'COUNTDOWN_UPDATE_INTERVAL': app.config['COUNTDOWN_UPDATE_INTERVAL'],
-            'RELAY_PIN': app.config['RELAY_PIN'],
-            'RELAY_ACTIVE_HIGH': app.config['RELAY_ACTIVE_HIGH'],
-            'GATE_OPEN_DURATION': app.config['GATE_OPEN_DURATION'],
-            'BEEP_RELAY_ALIGNMENT': app.config['BEEP_RELAY_ALIGNMENT']
-        }
+        settings = {key: app.config[key] for key in PERSISTED_SETTINGS}
+        if ORJSON_AVAILABLE:
+            content = orjson.dumps(settings, option=orjson.OPT_INDENT_2).decode()
+        else:
+            content = json.dumps(settings, indent=2)
+        
+        with _save_lock:
+            if content == _last_saved_settings:
+                return True
+            
+            # Write to a temp file and swap it in so a crash never leaves a partial file
+            tmp_path = SETTINGS_FILE + '.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(content)
+            os.replace(tmp_path, SETTINGS_FILE)
+            _last_saved_settings = content
         
-        with open(SETTINGS_FILE, 'w') as f:
-            json.dump(settings, f, indent=2)
         print(f"Settings saved to {SETTINGS_FILE}")
         return True
     except Exception as e:
         print(f"Error saving settings: {e}")
         return False
 
+def request_settings_save():
+    """Schedule a settings write, replacing any pending one so bursts of changes write once"""
+    global _save_timer, _settings_response, _settings_generation
+    with _save_lock:
+        _settings_generation += 1
+        _settings_response = None  # Settings changed, so the cached /get_settings body is stale
+        if _save_timer is not None:
+            _save_timer.cancel()
+        _save_timer = threading.Timer(SETTINGS_SAVE_DELAY, save_settings_to_file)
+        _save_timer.daemon = True
+        _save_timer.start()
+
+def flush_settings_save():
+    """Write any pending settings change immediately"""
+    global _save_timer
+    with _save_lock:
+        pending = _save_timer is not None and _save_timer.is_alive()
+        if _save_timer is not None:
+            _save_timer.cancel()
+            _save_timer = None
+    if pending:
+        save_settings_to_file()
+
+atexit.register(flush_settings_save)
+
+def validate_settings(settings):
+    """Check a full settings dict for wrongly typed or out-of-range values; returns an error message or None"""
+    if not isinstance(settings['HOST'], str) or not settings['HOST'].strip():
+        return 'Host must be a non-empty string'
+    for key in ('DEBUG', 'RELAY_ACTIVE_HIGH'):
+        if not isinstance(settings[key], bool):
+            return f'{key.lower()} must be true or false'
+    for key, coerce in PERSISTED_SETTINGS.items():
+        if coerce is float and not math.isfinite(settings[key]):
+            return f'{key.lower()} must be a finite number'
+    
+    if not 0.0 <= settings['AUDIO_VOLUME'] <= 1.0:
+        return 'Audio volume must be between 0.0 and 1.0'
+    buffer_size = settings['AUDIO_BUFFER']
+    if buffer_size < 64 or buffer_size & (buffer_size - 1):
+        return 'Audio buffer must be a power of two of at least 64 samples'
+    if not 1 <= settings['PORT'] <= 65535:
+        return 'Port must be between 1 and 65535'
+    if settings['DEFAULT_DELAY1'] <= 0 or settings['DEFAULT_DELAY2'] <= 0:
+        return 'Default delays must be greater than 0'
+    if not 0 < settings['MIN_TOTAL_TIME'] < settings['MAX_TOTAL_TIME']:
+        return 'Minimum total time must be greater than 0 and less than the maximum'
+    if settings['GATE_OPEN_DURATION'] <= 0:
+        return 'Gate open duration must be greater than 0'
+    if settings['AUTO_REFRESH_INTERVAL'] <= 0 or settings['COUNTDOWN_UPDATE_INTERVAL'] <= 0:
+        return 'Update intervals must be greater than 0'
+    return None
+
 # Load settings on startup
 load_settings_from_file()
 
-# Global variables for sequence state
-sequence_running = False
-sequence_stopped = False
-current_sequence = None
-sequence_start_time = None
+# Sequence state snapshot; always replaced as a whole so readers see a consistent view
+IDLE_STATE = {'running': False, 'sequence': None, 'start_time': None}
+sequence_state = IDLE_STATE
+stop_event = threading.Event()  # Set to interrupt the running sequence
+
+def set_sequence_state(running, sequence=None, start_time=None):
+    """Replace the sequence state snapshot with a single rebind"""
+    global sequence_state
+    if running:
+        sequence_state = {'running': True, 'sequence': sequence, 'start_time': start_time}
+    else:
+        sequence_state = IDLE_STATE
+
+# Status change notifications for /sequence_events subscribers
+status_changed = threading.Condition()
+status_version = 0
+STATUS_TICK_INTERVAL = 1.0       # Seconds between countdown resyncs while running
+STATUS_KEEPALIVE_INTERVAL = 5.0  # Seconds between idle keepalive events; also how fast a closed stream frees its slot
+# Each open stream holds a server thread for as long as the page is open
+status_stream_slots = threading.BoundedSemaphore(app.config['MAX_STATUS_STREAMS'])
+
+# Decoded beep sounds keyed by filename (rebuilt by init_audio)
+SOUND_CACHE = {}
+SOUND_CHANNELS = {}  # Reserved mixer channel per beep file
+
+# Audio init result for /health; only changes in init_audio
+audio_status = {'initialized': False, 'details': None}
+audio_lock = threading.Lock()  # Held while the mixer is reopened in the background and during each play
+_audio_reinit_guard = threading.Lock()  # Protects the two flags below
+_audio_reinit_pending = False  # Another reinit pass was requested
+_audio_reinit_running = False  # The audio-reinit thread is alive
+
+# aplay processes still playing (aplay backend only)
+aplay_processes = []
 
 # Relay control
 relay_device = None
 relay_active = False
+relay_queue = queue.Queue()  # (dispatch time in ns, active) writes for the relay I/O thread
+relay_thread = None
 
-class TimingSequence:
-    def __init__(self, delay1, delay2):
+# Sequence kinds
+SEQUENCE_TIMING = 'timing'  # Three beeps, then the relay
+SEQUENCE_TEST = 'test'      # Silence, final beep and relay (for offset calibration)
+TEST_SILENCE_DURATION = 3.0  # Seconds before the test beep
+
+class Sequence:
+    __slots__ = ('kind', 'delay1', 'delay2', 'alignment_offset', 'gate_open_duration', 'total_time', 'timeline')
+    
+    def __init__(self, kind, delay1, delay2, alignment_offset=0):
+        self.kind = kind
         self.delay1 = delay1  # Delay between beep 1 and beep 2
         self.delay2 = delay2  # Delay between beep 2 and beep 3
-        self.total_time = delay1 + delay2 + app.config['GATE_OPEN_DURATION']
+        self.alignment_offset = alignment_offset  # Relay activation relative to beep 3
+        self.gate_open_duration = app.config['GATE_OPEN_DURATION']
+        self.total_time = delay1 + delay2 + self.gate_open_duration
+        self.timeline = self.get_sequence_timeline()  # Fixed for the life of the sequence
+    
+    @classmethod
+    def timing(cls, delay1, delay2, alignment_offset=0):
+        """Regular three-beep sequence"""
+        return cls(SEQUENCE_TIMING, delay1, delay2, alignment_offset)
+    
+    @classmethod
+    def test(cls, offset):
+        """Test sequence: only the final beep, after TEST_SILENCE_DURATION"""
+        return cls(SEQUENCE_TEST, 0, TEST_SILENCE_DURATION, offset)
         
-    def get_sequence_timeline(self, alignment_offset=0):
+    def get_sequence_timeline(self):
         """Returns timeline of events in seconds from start"""
         beep3_time = self.delay1 + self.delay2
         gate_open_time = beep3_time  # Gate opens immediately after beep 3
-        relay_activation_time = beep3_time + alignment_offset  # Relay activation with alignment offset
+        # Relay activation with alignment offset, never before beep 2
+        relay_activation_time = max(beep3_time + self.alignment_offset, self.delay1)
         
         return {
-            'beep1': 0,
-            'beep2': self.delay1,
+            'beep1': 0,  # Not played in test mode
+            'beep2': self.delay1,  # Not played in test mode
             'beep3': beep3_time,
             'gate_open': gate_open_time,  # Immediately after beep 3
             'relay_activation': relay_activation_time,  # Relay activation with alignment offset
-            'reset': gate_open_time + app.config['GATE_OPEN_DURATION']
+            'reset': gate_open_time + self.gate_open_duration
         }
 
-class TestSequence:
-    def __init__(self, offset):
-        self.offset = offset  # Beep-relay alignment offset
-        self.total_time = 3.0 + app.config['GATE_OPEN_DURATION']
-        
-    def get_sequence_timeline(self):
-        """Returns timeline of events in seconds from start"""
-        beep_time = 3.0  # Beep plays at 3 seconds
-        gate_open_time = beep_time  # Gate opens immediately after beep
-        relay_activation_time = beep_time + self.offset  # Relay activation with offset
-        
-        return {
-            'beep1': 0,  # Not used in test mode
-            'beep2': 0,  # Not used in test mode
-            'beep3': beep_time,
-            'gate_open': gate_open_time,  # Immediately after beep
-            'relay_activation': relay_activation_time,  # Relay activation with offset
-            'reset': gate_open_time + app.config['GATE_OPEN_DURATION']
-        }
+# Buffer sizes to fall back to when the driver cannot sustain the configured one
+AUDIO_BUFFER_FALLBACKS = (512, 1024, 2048, 4096)
 
 def init_audio():
     """Initialize pygame mixer for audio playback with retry logic"""
+    set_audio_status(None)
+    
+    if app.config['AUDIO_BACKEND'] == 'aplay':
+        if shutil.which('aplay') is None:
+            print("Audio initialization failed: aplay not found (install alsa-utils)")
+            return False
+        print(f"Audio system using aplay on ALSA device {app.config['AUDIO_DEVICE']}")
+        # Check the beeps now instead of on every play
+        for filename in (app.config['BEEP1_FILE'], app.config['BEEP2_FILE'], app.config['BEEP3_FILE']):
+            if not os.path.exists(audio_path(filename)):
+                print(f"Audio file not found: {audio_path(filename)}")
+        set_audio_status(app.config['AUDIO_DEVICE'])
+        return True
+    
+    if not PYGAME_AVAILABLE:
+        print("Audio initialization failed: pygame not installed (or set AUDIO_BACKEND = 'aplay')")
+        return False
+    
     max_retries = 3
     retry_delay = 0.5
     
+    # Smallest buffer first: it sets the latency between .play() and the DAC
+    configured_buffer = app.config['AUDIO_BUFFER']
+    buffer_sizes = [configured_buffer] + [b for b in AUDIO_BUFFER_FALLBACKS if b > configured_buffer]
+    
     for attempt in range(max_retries):
+        buffer_size = buffer_sizes[min(attempt, len(buffer_sizes) - 1)]
         try:
             # First, try to quit any existing mixer to ensure clean state
             if pygame.mixer.get_init() is not None:
+                SOUND_CACHE.clear()  # Sounds and channels belong to the old mixer instance
+                SOUND_CHANNELS.clear()
                 pygame.mixer.quit()
                 time.sleep(0.1)  # Brief pause after quit
             
-            # Initialize with more conservative settings
-            pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=1024)
+            pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=buffer_size)
             
             # Verify initialization was successful
             if pygame.mixer.get_init() is not None:
-                print(f"Audio system initialized successfully (attempt {attempt + 1})")
+                print(f"Audio system initialized successfully with buffer={buffer_size} (attempt {attempt + 1})")
+                load_sound_cache()
+                set_audio_status(pygame.mixer.get_init())
                 return True
             else:
                 print(f"Audio initialization returned None (attempt {attempt + 1})")
@@ -157,62 +361,191 @@ def init_audio():
     print("Audio initialization failed after all retries")
     return False
 
+def set_audio_status(details):
+    """Record the audio init result (None if audio is down)"""
+    global audio_status
+    audio_status = {'initialized': details is not None, 'details': details}
+
+@functools.lru_cache(maxsize=8)
+def audio_path(filename):
+    """Path of a file in the audio directory (AUDIO_DIR is fixed for the process)"""
+    return os.path.join(app.config['AUDIO_DIR'], filename)
+
+def mixer_initialized():
+    """True if the pygame mixer is open"""
+    return PYGAME_AVAILABLE and pygame.mixer.get_init() is not None
+
+def load_sound(filename):
+    """Decode an audio file into the sound cache; returns the Sound or None if missing"""
+    path = audio_path(filename)
+    if not os.path.exists(path):
+        print(f"Audio file not found: {path}")
+        return None
+    
+    sound = pygame.mixer.Sound(path)
+    # Apply configured volume to this sound (0.0 - 1.0)
+    try:
+        sound.set_volume(app.config['AUDIO_VOLUME'])
+    except Exception:
+        pass
+    SOUND_CACHE[filename] = sound
+    return sound
+
+def load_sound_cache():
+    """Pre-decode the beep files so playback during a sequence is just .play()"""
+    beep_files = (app.config['BEEP1_FILE'], app.config['BEEP2_FILE'], app.config['BEEP3_FILE'])
+    SOUND_CACHE.clear()
+    for filename in beep_files:
+        try:
+            load_sound(filename)
+        except Exception as e:
+            print(f"Error loading audio {filename}: {e}")
+    print(f"Loaded {len(SOUND_CACHE)} sounds into cache")
+    
+    # Give each beep its own reserved channel so playback never waits on channel allocation
+    SOUND_CHANNELS.clear()
+    pygame.mixer.set_reserved(len(beep_files))
+    for index, filename in enumerate(beep_files):
+        SOUND_CHANNELS[filename] = pygame.mixer.Channel(index)
+
+def play_sound(filename, sound):
+    """Play a sound on its reserved channel, or any free channel if it has none"""
+    channel = SOUND_CHANNELS.get(filename)
+    if channel is not None:
+        channel.play(sound)
+    else:
+        sound.play()
+
+def apply_audio_volume():
+    """Apply the configured volume to all cached sounds"""
+    for sound in SOUND_CACHE.values():
+        try:
+            sound.set_volume(app.config['AUDIO_VOLUME'])
+        except Exception:
+            pass
+
+def play_with_aplay(filename):
+    """Play an audio file with ALSA's aplay, bypassing the SDL mixer and its buffer"""
+    try:
+        process = subprocess.Popen(['aplay', '-q', '-D', app.config['AUDIO_DEVICE'], audio_path(filename)],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except OSError as e:
+        print(f"Error playing audio {filename} with aplay: {e}")
+        return False
+    
+    # Keep handles so stop_audio() can cut playback off; drop finished ones
+    aplay_processes[:] = [p for p in aplay_processes if p.poll() is None]
+    aplay_processes.append(process)
+    status_log.debug("Playing audio: %s", filename)
+    return True
+
+def stop_audio():
+    """Stop any beep that is still playing"""
+    for process in aplay_processes:
+        if process.poll() is None:
+            process.kill()
+    aplay_processes.clear()
+    
+    if mixer_initialized():
+        pygame.mixer.stop()
+
 def play_audio_file(filename):
+    """Play an audio file on the configured backend"""
+    if app.config['AUDIO_BACKEND'] == 'aplay':
+        return play_with_aplay(filename)
+    
+    # Held across the play so a background reinit can never tear the mixer down mid-call
+    if not audio_lock.acquire(blocking=False):
+        print(f"Audio system is reinitializing, skipping {filename}")
+        return False
+    try:
+        return play_with_mixer(filename)
+    finally:
+        audio_lock.release()
+
+def play_with_mixer(filename):
     """Play an audio file using pygame with fallback initialization"""
-    audio_path = os.path.join(app.config['AUDIO_DIR'], filename)
     try:
         # Check if audio system is still initialized
-        if pygame.mixer.get_init() is None:
+        if not mixer_initialized():
             print("Audio system not initialized, attempting to reinitialize...")
             if not init_audio():
                 print("Failed to reinitialize audio system")
                 return False
 
-        if os.path.exists(audio_path):
-            sound = pygame.mixer.Sound(audio_path)
-            # Apply configured volume to this sound (0.0 - 1.0)
-            try:
-                sound.set_volume(app.config['AUDIO_VOLUME'])
-            except Exception:
-                pass
-            sound.play()
-            print(f"Playing audio: {filename}")
-            return True
-        else:
-            print(f"Audio file not found: {audio_path}")
+        # Cache miss falls back to decoding from disk
+        sound = SOUND_CACHE.get(filename) or load_sound(filename)
+        if sound is None:
             return False
+        play_sound(filename, sound)
+        status_log.debug("Playing audio: %s", filename)
+        return True
     except Exception as e:
         print(f"Error playing audio {filename}: {e}")
         # Try to reinitialize audio system on error
         print("Attempting to reinitialize audio system...")
         if init_audio():
             try:
-                sound = pygame.mixer.Sound(audio_path)
-                try:
-                    sound.set_volume(app.config['AUDIO_VOLUME'])
-                except Exception:
-                    pass
-                sound.play()
+                sound = SOUND_CACHE.get(filename) or load_sound(filename)
+                if sound is None:
+                    return False
+                play_sound(filename, sound)
                 print(f"Successfully played audio after reinitialization: {filename}")
                 return True
             except Exception as retry_e:
                 print(f"Failed to play audio even after reinitialization: {retry_e}")
         return False
 
+def reinit_audio_async():
+    """Reopen the audio backend on a background thread; returns False if a sequence is running or queued"""
+    global _audio_reinit_pending, _audio_reinit_running
+    with _audio_reinit_guard:
+        # submit_sequence() checks _audio_reinit_running under the same guard, so the two never overlap
+        if sequence_slot.locked():
+            return False
+        _audio_reinit_pending = True
+        if _audio_reinit_running:
+            return True
+        _audio_reinit_running = True
+    threading.Thread(target=run_audio_reinit, name='audio-reinit', daemon=True).start()
+    return True
+
+def run_audio_reinit():
+    """Reopen the audio backend until no further reinit has been requested"""
+    global _audio_reinit_pending, _audio_reinit_running
+    while True:
+        with _audio_reinit_guard:
+            if not _audio_reinit_pending:
+                _audio_reinit_running = False
+                return
+            _audio_reinit_pending = False
+        # Each pass reads the config afresh, so the latest buffer size always wins
+        with audio_lock:
+            init_audio()
+
 def init_relay():
     """Initialize the relay GPIO device"""
-    global relay_device
+    global relay_device, relay_thread
     
     if not GPIO_AVAILABLE:
         print("GPIO not available - relay will be simulated")
         return True
     
     try:
+        # Only takes effect before gpiozero creates its first device
+        if app.config['RELAY_PIN_FACTORY']:
+            os.environ['GPIOZERO_PIN_FACTORY'] = app.config['RELAY_PIN_FACTORY']
+        
         relay_device = DigitalOutputDevice(
             pin=app.config['RELAY_PIN'],
             active_high=app.config['RELAY_ACTIVE_HIGH']
         )
         print(f"Relay initialized on pin {app.config['RELAY_PIN']} (active_high={app.config['RELAY_ACTIVE_HIGH']})")
+        
+        # Drive the pin from its own thread so GPIO writes never stall the sequence timing
+        if relay_thread is None:
+            relay_thread = threading.Thread(target=relay_worker, name='relay-io', daemon=True)
+            relay_thread.start()
         return True
     except Exception as e:
         print(f"Failed to initialize relay: {e}")
@@ -225,231 +558,248 @@ def set_relay_state(active):
     relay_active = active
     
     if GPIO_AVAILABLE and relay_device:
+        # Hand the write to the relay I/O thread; the caller never blocks on GPIO
+        relay_queue.put_nowait((time.monotonic_ns(), active))
+    else:
+        # Simulation mode
+        status = "ACTIVE" if active else "INACTIVE"
+        status_log.debug("Relay simulation: %s", status)
+    
+    publish_status()
+
+def relay_worker():
+    """Apply queued relay writes on a dedicated thread"""
+    # Runs for the life of the process, so it keeps real-time priority throughout
+    enable_realtime_scheduling('RELAY_CPU')
+    while True:
+        dispatched, active = relay_queue.get()
         try:
             if active:
                 relay_device.on()
-                print("Relay activated")
             else:
                 relay_device.off()
-                print("Relay deactivated")
+            latency_us = (time.monotonic_ns() - dispatched) / 1000
+            status_log.debug("Relay %s (%.0f us after dispatch)",
+                             "activated" if active else "deactivated", latency_us)
         except Exception as e:
             print(f"Error controlling relay: {e}")
-    else:
-        # Simulation mode
-        status = "ACTIVE" if active else "INACTIVE"
-        print(f"Relay simulation: {status}")
+
+def publish_status():
+    """Wake /sequence_events streams after a phase or relay change"""
+    global status_version
+    with status_changed:
+        status_version += 1
+        status_changed.notify_all()
 
 def get_relay_status():
     """Get current relay status"""
-    global relay_active
     return relay_active
 
+def enable_realtime_scheduling(cpu_setting='SEQUENCE_CPU'):
+    """Promote the calling thread to SCHED_FIFO; returns the previous CPU affinity or None"""
+    priority = app.config['SEQUENCE_RT_PRIORITY']
+    cpu = app.config[cpu_setting]
+    previous_affinity = None
+    
+    if priority and hasattr(os, 'sched_setscheduler'):
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        except OSError as e:
+            print(f"Real-time scheduling unavailable, using default scheduler: {e}")
+    
+    if cpu is not None and hasattr(os, 'sched_setaffinity'):
+        try:
+            previous_affinity = os.sched_getaffinity(0)
+            os.sched_setaffinity(0, {cpu})
+        except OSError as e:
+            print(f"Could not pin {threading.current_thread().name} thread to CPU {cpu}: {e}")
+            previous_affinity = None
+    
+    return previous_affinity
+
+def restore_default_scheduling(previous_affinity=None):
+    """Return the calling thread to SCHED_OTHER (and its previous CPU affinity)"""
+    if hasattr(os, 'sched_setscheduler'):
+        try:
+            if os.sched_getscheduler(0) != os.SCHED_OTHER:
+                os.sched_setscheduler(0, os.SCHED_OTHER, os.sched_param(0))
+        except OSError:
+            pass
+    
+    if previous_affinity:
+        try:
+            os.sched_setaffinity(0, previous_affinity)
+        except OSError:
+            pass
+
+def lock_process_memory():
+    """Lock current and future pages into RAM with mlockall()"""
+    MCL_CURRENT, MCL_FUTURE = 1, 2
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        print("Process memory locked")
+        return True
+    except (OSError, AttributeError, TypeError) as e:
+        print(f"Could not lock process memory, continuing without: {e}")
+        return False
+
+# Final stretch before each deadline that is slept without the stop check, for a tighter wakeup
+PRECISE_WAIT_MARGIN = 0.002
+
+def wait_until(deadline):
+    """Wait until a time.monotonic() deadline; returns True if the sequence was stopped"""
+    # Stop-aware wait for the bulk of the interval...
+    if stop_event.wait(max(0, deadline - time.monotonic() - PRECISE_WAIT_MARGIN)):
+        return True
+    
+    # ...then land on the deadline with a plain sleep (clock_nanosleep on Linux)
+    remaining = deadline - time.monotonic()
+    if remaining > 0:
+        time.sleep(remaining)
+    return stop_event.is_set()
+
+def play_beep(filename):
+    """Play a sequence beep and wake status streams"""
+    play_audio_file(filename)
+    publish_status()
+
+def run_timeline(t0, events):
+    """Fire (time, action) events in time order from t0; returns False if the sequence was stopped"""
+    # Stable sort: events at the same time keep their listed order
+    for at, action in sorted(events, key=lambda event: event[0]):
+        if wait_until(t0 + at):
+            return False
+        action()
+    return True
+
 def run_sequence(sequence):
     """Run the timing sequence in a separate thread"""
-    global sequence_running, sequence_stopped, current_sequence, sequence_start_time
+    # Snapshot config once so the timing path does no config lookups
+    config = app.config
+    beep1_file, beep2_file, beep3_file = config['BEEP1_FILE'], config['BEEP2_FILE'], config['BEEP3_FILE']
+    alignment_offset = sequence.alignment_offset
+    gate_open_duration = sequence.gate_open_duration
+    timeline = sequence.timeline
+    
+    previous_affinity = enable_realtime_scheduling()
     
-    sequence_running = True
-    sequence_stopped = False
-    current_sequence = sequence
-    sequence_start_time = time.time()
+    t0 = time.monotonic()
+    set_sequence_state(True, sequence, t0)
     
-    timeline = sequence.get_sequence_timeline(app.config['BEEP_RELAY_ALIGNMENT'])
+    publish_status()
     
     try:
-        # Play beep 1 immediately
-        print("Playing beep 1")
-        play_audio_file(app.config['BEEP1_FILE'])
-        
-        # Wait for delay 1 (with stop check)
-        for _ in range(int(sequence.delay1 * 10)):  # Check every 0.1 seconds
-            if sequence_stopped:
-                return
-            time.sleep(0.1)
+        if alignment_offset < -sequence.delay2:
+            sequence_log.warning("Offset %ss is larger than delay2 %ss, relay activates with beep 2", alignment_offset, sequence.delay2)
         
-        if sequence_stopped:
-            return
-            
-        # Play beep 2
-        print("Playing beep 2")
-        play_audio_file(app.config['BEEP2_FILE'])
-        
-        # Calculate timing for relay activation
-        alignment_offset = app.config['BEEP_RELAY_ALIGNMENT']
-        
-        # Adjust delay2 if we have a negative offset
-        if alignment_offset < 0:
-            # For negative offset, we need to activate relay earlier
-            # So we reduce delay2 by the offset amount
-            adjusted_delay2 = sequence.delay2 + alignment_offset
-            print(f"Adjusted delay2 to {adjusted_delay2}s for negative offset")
-            
-            # Ensure we don't have negative delay
-            if adjusted_delay2 < 0:
-                print(f"Warning: offset {alignment_offset}s is larger than delay2 {sequence.delay2}s")
-                adjusted_delay2 = 0
-        else:
-            adjusted_delay2 = sequence.delay2
+        # The relay stays active for the gate open duration after beep 3 or activation, whichever is later
+        relay_on_time = max(timeline['beep3'], timeline['relay_activation'])
+        events = [
+            (timeline['beep1'], lambda: play_beep(beep1_file)),
+            (timeline['beep2'], lambda: play_beep(beep2_file)),
+            # Relay first on a tie: queuing the GPIO write returns at once, play() may not
+            (timeline['relay_activation'], lambda: set_relay_state(True)),
+            (timeline['beep3'], lambda: play_beep(beep3_file)),
+            (relay_on_time + gate_open_duration, lambda: set_relay_state(False)),
+        ]
         
-        # Wait for adjusted delay 2 (with stop check)
-        if adjusted_delay2 > 0:
-            for _ in range(int(adjusted_delay2 * 10)):  # Check every 0.1 seconds
-                if sequence_stopped:
-                    return
-                time.sleep(0.1)
-        
-        if sequence_stopped:
-            return
-            
-        # Handle relay activation based on offset
-        if alignment_offset < 0:
-            # Negative offset: relay activates now (before beep 3)
-            print(f"Relay activating {abs(alignment_offset)}s before beep 3")
-            set_relay_state(True)
-            
-            # Wait for the remaining time until beep 3
-            for _ in range(int(abs(alignment_offset) * 10)):  # Check every 0.1 seconds
-                if sequence_stopped:
-                    return
-                time.sleep(0.1)
-        else:
-            # Positive or zero offset: relay activates after beep 3
-            # No additional waiting needed here - we'll handle it after beep 3
-            pass
-        
-        if sequence_stopped:
-            return
-            
-        # Play beep 3 (long beep)
-        print("Playing beep 3")
-        play_audio_file(app.config['BEEP3_FILE'])
-        
-        # Gate open phase starts immediately after beep 3
-        print("Gate open phase")
-        
-        if alignment_offset >= 0:
-            # Positive or zero offset: activate relay after beep 3
-            if alignment_offset > 0:
-                for _ in range(int(alignment_offset * 10)):  # Check every 0.1 seconds
-                    if sequence_stopped:
-                        return
-                    time.sleep(0.1)
-            set_relay_state(True)
-        
-        # Wait for configured gate open duration
-        gate_open_duration = app.config['GATE_OPEN_DURATION']
-        steps = max(1, int(gate_open_duration * 10))
-        for _ in range(steps):  # Check every 0.1 seconds
-            if sequence_stopped:
-                return
-            time.sleep(0.1)
-        
-        set_relay_state(False)  # Deactivate relay
-        
-        print("Sequence completed successfully")
+        if run_timeline(t0, events):
+            sequence_log.info("Sequence completed successfully")
         
     except Exception as e:
-        print(f"Sequence error: {e}")
+        sequence_log.error("Sequence error: %s", e)
     finally:
-        print("Resetting sequence state")
+        sequence_log.info("Resetting sequence state")
         set_relay_state(False)  # Ensure relay is off
-        sequence_running = False
-        sequence_stopped = False
-        current_sequence = None
-        sequence_start_time = None
-        print("Sequence reset complete")
+        set_sequence_state(False)
+        stop_event.clear()
+        restore_default_scheduling(previous_affinity)
+        publish_status()
+        sequence_log.info("Sequence reset complete")
 
 def run_test_sequence(sequence):
     """Run the test sequence in a separate thread (3s silence + final beep + relay)"""
-    global sequence_running, sequence_stopped, current_sequence, sequence_start_time
+    # Snapshot config once so the timing path does no config lookups
+    beep3_file = app.config['BEEP3_FILE']
+    gate_open_duration = sequence.gate_open_duration
+    timeline = sequence.timeline
+    
+    previous_affinity = enable_realtime_scheduling()
     
-    sequence_running = True
-    sequence_stopped = False
-    current_sequence = sequence
-    sequence_start_time = time.time()
+    t0 = time.monotonic()
+    set_sequence_state(True, sequence, t0)
     
-    timeline = sequence.get_sequence_timeline()
+    publish_status()
     
     try:
-        print("Test sequence started - 3 seconds silence")
-        
-        # Calculate timing for relay activation
-        beep_time = 3.0
-        offset = sequence.offset
-        
-        # Handle relay activation based on offset
-        if offset < 0:
-            # Negative offset: relay activates before beep
-            print(f"Relay will activate {abs(offset)}s before beep")
-            # Wait for the time until relay activation (beep_time + offset)
-            relay_activation_time = beep_time + offset
-            if relay_activation_time > 0:
-                for _ in range(int(relay_activation_time * 10)):  # Check every 0.1 seconds
-                    if sequence_stopped:
-                        return
-                    time.sleep(0.1)
-            
-            if sequence_stopped:
-                return
-                
-            # Activate relay
-            set_relay_state(True)
-            
-            # Wait remaining time until beep
-            for _ in range(int(abs(offset) * 10)):  # Check every 0.1 seconds
-                if sequence_stopped:
-                    return
-                time.sleep(0.1)
-        else:
-            # Positive or zero offset: wait until beep time
-            for _ in range(int(beep_time * 10)):  # Check every 0.1 seconds for 3 seconds
-                if sequence_stopped:
-                    return
-                time.sleep(0.1)
-        
-        if sequence_stopped:
-            return
-        
-        if sequence_stopped:
-            return
-            
-        # Play final beep (beep 3)
-        print("Playing final beep")
-        play_audio_file(app.config['BEEP3_FILE'])
-        
-        # Gate open phase starts immediately after beep
-        print("Gate open phase")
-        
-        if offset >= 0:
-            # Positive or zero offset: activate relay after beep
-            if offset > 0:
-                for _ in range(int(offset * 10)):  # Check every 0.1 seconds
-                    if sequence_stopped:
-                        return
-                    time.sleep(0.1)
-            set_relay_state(True)
-        
-        # Wait for configured gate open duration
-        gate_open_duration = app.config['GATE_OPEN_DURATION']
-        steps = max(1, int(gate_open_duration * 10))
-        for _ in range(steps):  # Check every 0.1 seconds
-            if sequence_stopped:
-                return
-            time.sleep(0.1)
+        sequence_log.info("Test sequence started - 3 seconds silence")
         
-        set_relay_state(False)  # Deactivate relay
+        relay_on_time = max(timeline['beep3'], timeline['relay_activation'])
+        events = [
+            # Relay first on a tie: queuing the GPIO write returns at once, play() may not
+            (timeline['relay_activation'], lambda: set_relay_state(True)),
+            (timeline['beep3'], lambda: play_beep(beep3_file)),
+            (relay_on_time + gate_open_duration, lambda: set_relay_state(False)),
+        ]
         
-        print("Test sequence completed successfully")
+        if run_timeline(t0, events):
+            sequence_log.info("Test sequence completed successfully")
         
     except Exception as e:
-        print(f"Test sequence error: {e}")
+        sequence_log.error("Test sequence error: %s", e)
     finally:
-        print("Resetting test sequence state")
+        sequence_log.info("Resetting test sequence state")
         set_relay_state(False)  # Ensure relay is off
-        sequence_running = False
-        sequence_stopped = False
-        current_sequence = None
-        sequence_start_time = None
-        print("Test sequence reset complete")
+        set_sequence_state(False)
+        stop_event.clear()
+        restore_default_scheduling(previous_affinity)
+        publish_status()
+        sequence_log.info("Test sequence reset complete")
+
+# Single long-lived sequence worker; jobs are handed over through a one-slot queue
+sequence_queue = queue.Queue(maxsize=1)
+sequence_slot = threading.Lock()  # Held from a successful start request until the job finishes
+
+def sequence_worker():
+    """Run queued sequences one at a time on a persistent thread"""
+    while True:
+        sequence = sequence_queue.get()
+        runner = run_test_sequence if sequence.kind == SEQUENCE_TEST else run_sequence
+        # No garbage collection pauses while the sequence is timing beeps
+        gc.disable()
+        try:
+            runner(sequence)
+        except Exception as e:
+            sequence_log.error("Sequence worker error: %s", e)
+        finally:
+            gc.enable()
+            sequence_slot.release()
+            gc.collect()
+
+def submit_sequence(sequence):
+    """Queue a sequence for the worker; returns an error message if it cannot start"""
+    if not sequence_slot.acquire(blocking=False):
+        return 'Sequence already running'
+    
+    # Every beep would be skipped while the mixer is being reopened
+    with _audio_reinit_guard:
+        if _audio_reinit_running:
+            sequence_slot.release()
+            return 'Audio is reinitializing, try again in a moment'
+    
+    # Reset stop flag before starting the new sequence
+    stop_event.clear()
+    sequence_queue.put_nowait(sequence)
+    return None
+
+threading.Thread(target=sequence_worker, name='sequence-worker', daemon=True).start()
+
+def get_request_data():
+    """Parse the JSON request body without raising; returns None if missing or malformed"""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
 
 @app.route('/')
 def index():
@@ -461,19 +811,17 @@ def index():
 @app.route('/start_sequence', methods=['POST'])
 def start_sequence():
     """Start a new timing sequence"""
-    global sequence_running, sequence_stopped
-    
-    if sequence_running:
-        return jsonify({'success': False, 'message': 'Sequence already running'})
-    
     try:
-        # Reset stop flag before starting new sequence
-        sequence_stopped = False
-        
-        data = request.get_json()
+        data = get_request_data()
+        if data is None:
+            return jsonify({'success': False, 'message': 'Request body must be a JSON object'})
         delay1 = float(data.get('delay1', app.config['DEFAULT_DELAY1']))
         delay2 = float(data.get('delay2', app.config['DEFAULT_DELAY2']))
         
+        # NaN would slip through the range check below (every comparison with it is False)
+        if not (math.isfinite(delay1) and math.isfinite(delay2)) or delay1 < 0 or delay2 < 0:
+            return jsonify({'success': False, 'message': 'Delays must be non-negative numbers'})
+        
         # Validate delays using configured constraints
         total_time = delay1 + delay2 + app.config['GATE_OPEN_DURATION']
         min_total = app.config['MIN_TOTAL_TIME']
@@ -481,12 +829,12 @@ def start_sequence():
         if total_time < min_total or total_time > max_total:
             return jsonify({'success': False, 'message': f'Total sequence time must be between {min_total:.1f}-{max_total:.1f} seconds'})
         
-        sequence = TimingSequence(delay1, delay2)
+        sequence = Sequence.timing(delay1, delay2, app.config['BEEP_RELAY_ALIGNMENT'])
         
-        # Start sequence in background thread
-        thread = threading.Thread(target=run_sequence, args=(sequence,))
-        thread.daemon = True
-        thread.start()
+        # Hand the sequence to the background worker
+        error = submit_sequence(sequence)
+        if error:
+            return jsonify({'success': False, 'message': error})
         
         return jsonify({'success': True, 'message': 'Sequence started'})
         
@@ -498,32 +846,26 @@ def set_random_values():
     """Set random timing values without starting sequence"""
     try:
         # Generate random delays with constraint: delay2 > delay1
-        import random
+        # Delays are drawn as whole tenths of a second, matching the slider step
         
         # Generate delay1 between 1-8 seconds
-        delay1 = round(random.uniform(1.0, 8.0), 1)
+        delay1 = random.randint(10, 80) / 10.0
         
         # Generate delay2 within configured bounds and ensuring delay2 > delay1
         min_total = app.config['MIN_TOTAL_TIME']
         max_total = app.config['MAX_TOTAL_TIME']
         gate_open_duration = app.config['GATE_OPEN_DURATION']
         
-        min_delay2 = max(delay1 + 0.5, min_total - delay1 - gate_open_duration)
-        max_delay2 = min(12.0, max_total - delay1 - gate_open_duration)
+        # round() first so float noise like 69.99999 doesn't shift the bound by a tenth
+        min_delay2_tenths = math.ceil(round(max(delay1 + 0.5, min_total - delay1 - gate_open_duration) * 10, 6))
+        max_delay2_tenths = math.floor(round(min(12.0, max_total - delay1 - gate_open_duration) * 10, 6))
         
-        if min_delay2 >= max_delay2:
+        if min_delay2_tenths >= max_delay2_tenths:
             # Fallback to safe values if random generation window is invalid
             delay1 = 3.0
             delay2 = 5.0
         else:
-            delay2 = round(random.uniform(min_delay2, max_delay2), 1)
-        
-        # Validate total time
-        total_time = delay1 + delay2 + 1
-        if total_time < 6 or total_time > 18:
-            # Fallback to safe values if random generation fails
-            delay1 = 3.0
-            delay2 = 5.0
+            delay2 = random.randint(min_delay2_tenths, max_delay2_tenths) / 10.0
         
         return jsonify({
             'success': True, 
@@ -538,25 +880,21 @@ def set_random_values():
 @app.route('/start_test_sequence', methods=['POST'])
 def start_test_sequence():
     """Start a test timing sequence (3s silence + final beep + relay)"""
-    global sequence_running, sequence_stopped
-    
-    if sequence_running:
-        return jsonify({'success': False, 'message': 'Sequence already running'})
-    
     try:
-        # Reset stop flag before starting new test sequence
-        sequence_stopped = False
-        
-        data = request.get_json()
+        data = get_request_data()
+        if data is None:
+            return jsonify({'success': False, 'message': 'Request body must be a JSON object'})
         offset = float(data.get('offset', 0.0))
+        if not math.isfinite(offset):
+            return jsonify({'success': False, 'message': 'Offset must be a finite number'})
         
         # Create test sequence: 3 seconds silence + final beep + relay
-        sequence = TestSequence(offset)
+        sequence = Sequence.test(offset)
         
-        # Start sequence in background thread
-        thread = threading.Thread(target=run_test_sequence, args=(sequence,))
-        thread.daemon = True
-        thread.start()
+        # Hand the sequence to the background worker
+        error = submit_sequence(sequence)
+        if error:
+            return jsonify({'success': False, 'message': error})
         
         return jsonify({'success': True, 'message': 'Test sequence started'})
         
@@ -566,56 +904,46 @@ def start_test_sequence():
 @app.route('/stop_sequence', methods=['POST'])
 def stop_sequence():
     """Stop the current sequence"""
-    global sequence_running, sequence_stopped, current_sequence, sequence_start_time
-    
-    if not sequence_running:
+    if not sequence_state['running']:
         return jsonify({'success': False, 'message': 'No sequence running'})
     
     try:
-        # Set stop flag to interrupt the sequence
-        sequence_stopped = True
+        # Set stop flag to interrupt the sequence (wakes any pending wait)
+        stop_event.set()
         
-        # Deactivate relay immediately when stopping
+        # Deactivate relay and cut off any playing beep immediately when stopping
+        # (the sequence thread resets its own state as it unwinds)
         set_relay_state(False)
+        stop_audio()
         
-        # Immediately reset all sequence state
-        sequence_running = False
-        current_sequence = None
-        sequence_start_time = None
-        
-        print("Sequence stopped and reset immediately")
+        sequence_log.info("Sequence stopped")
         return jsonify({'success': True, 'message': 'Sequence stopped and reset'})
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
 
-@app.route('/sequence_status')
-def sequence_status():
-    """Get current sequence status for real-time updates"""
-    global sequence_running, current_sequence, sequence_start_time, sequence_stopped
-    
-    # If sequence was stopped, immediately return idle state
-    if sequence_stopped:
-        return jsonify({
-            'running': False,
-            'current_time': 0,
-            'total_time': 0,
-            'phase': 'idle'
-        })
-    
-    if not sequence_running or not current_sequence or not sequence_start_time:
-        return jsonify({
-            'running': False,
-            'current_time': 0,
-            'total_time': 0,
-            'phase': 'idle'
-        })
+# Idle status never changes, so its JSON body is serialized once
+IDLE_STATUS = {
+    'running': False,
+    'current_time': 0,
+    'total_time': 0,
+    'phase': 'idle'
+}
+IDLE_STATUS_BODY = app.json.dumps(IDLE_STATUS)
+
+def build_sequence_status():
+    """Build the current sequence status payload (IDLE_STATUS itself when idle)"""
+    # A stopped sequence reports idle immediately, before its thread has reset
+    state = sequence_state
+    if not state['running'] or stop_event.is_set():
+        return IDLE_STATUS
     
-    current_time = time.time() - sequence_start_time
+    current_sequence = state['sequence']
+    current_time = time.monotonic() - state['start_time']
+    timeline = current_sequence.timeline
     
     # Handle test sequence differently
-    if hasattr(current_sequence, 'offset'):
+    if current_sequence.kind == SEQUENCE_TEST:
         # Test sequence
-        timeline = current_sequence.get_sequence_timeline()
         if current_time < timeline['beep3']:
             phase = 'test_silence'
             countdown = timeline['beep3'] - current_time
@@ -628,7 +956,6 @@ def sequence_status():
             countdown = 0
     else:
         # Regular sequence
-        timeline = current_sequence.get_sequence_timeline(app.config['BEEP_RELAY_ALIGNMENT'])
         if current_time < timeline['beep2']:
             phase = 'delay1'
             countdown = timeline['beep2'] - current_time
@@ -643,10 +970,7 @@ def sequence_status():
             phase = 'complete'
             countdown = 0
     
-    # Debug logging
-    print(f"Status: running={sequence_running}, current_time={current_time:.1f}, phase={phase}, countdown={countdown:.1f}")
-    
-    return jsonify({
+    return {
         'running': True,
         'current_time': current_time,
         'total_time': current_sequence.total_time,
@@ -654,20 +978,66 @@ def sequence_status():
         'countdown': countdown,
         'timeline': timeline,
         'relay_active': get_relay_status()
-    })
+    }
+
+@app.route('/sequence_status')
+def sequence_status():
+    """Get current sequence status (polling fallback for /sequence_events)"""
+    status = build_sequence_status()
+    if status is IDLE_STATUS:
+        return app.response_class(IDLE_STATUS_BODY, mimetype='application/json')
+    
+    # Debug logging
+    status_log.debug("Status: running=True current_time=%.1f phase=%s countdown=%.1f",
+                     status['current_time'], status['phase'], status['countdown'])
+    
+    return jsonify(status)
+
+@app.route('/sequence_events')
+def sequence_events():
+    """Server-Sent Events stream of sequence status, pushed on each phase change"""
+    # Past the limit the client falls back to polling /sequence_status
+    if not status_stream_slots.acquire(blocking=False):
+        return Response('Too many status streams', status=503, mimetype='text/plain')
+    
+    def event_stream():
+        last_version = None
+        while True:
+            with status_changed:
+                if last_version == status_version:
+                    # Low-rate resync while running, keepalive while idle
+                    status_changed.wait(STATUS_TICK_INTERVAL if sequence_state['running'] else STATUS_KEEPALIVE_INTERVAL)
+                last_version = status_version
+            status = build_sequence_status()
+            body = IDLE_STATUS_BODY if status is IDLE_STATUS else app.json.dumps(status)
+            yield f"data: {body}\n\n"
+    
+    response = Response(event_stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache'})
+    response.call_on_close(status_stream_slots.release)
+    return response
 
     # Note: Bluetooth scan endpoint removed as it's unused.
 
+AUDIO_CACHE_MAX_AGE = 31536000  # One year; beep files only change with a deploy
+
 @app.route('/audio/<filename>')
 def serve_audio(filename):
-    """Serve audio files"""
-    return send_from_directory(app.config['AUDIO_DIR'], filename)
+    """Serve the beep files (browser-cacheable, 304 on ETag/Last-Modified match)"""
+    # Only the configured beeps are served, so no arbitrary path ever reaches the filesystem
+    if filename not in (app.config['BEEP1_FILE'], app.config['BEEP2_FILE'], app.config['BEEP3_FILE']):
+        abort(404)
+    
+    response = send_file(audio_path(filename), conditional=True, max_age=AUDIO_CACHE_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={AUDIO_CACHE_MAX_AGE}, immutable'
+    return response
 
 @app.route('/settings')
 def settings():
     """Settings page"""
     return render_template('settings.html', 
-                         config=app.config)
+                         config=app.config,
+                         default_audio_buffer=Config.AUDIO_BUFFER)
 
 @app.route('/test')
 def test():
@@ -678,17 +1048,19 @@ def test():
 def save_test_offset():
     """Save test offset to persistent settings"""
     try:
-        data = request.get_json()
+        data = get_request_data()
+        if data is None:
+            return jsonify({'success': False, 'message': 'Request body must be a JSON object'})
         offset = float(data.get('offset', 0.0))
+        if not math.isfinite(offset):
+            return jsonify({'success': False, 'message': 'Offset must be a finite number'})
         
         # Update the beep-relay alignment setting
         app.config['BEEP_RELAY_ALIGNMENT'] = offset
         
-        # Save to file for persistence
-        if save_settings_to_file():
-            return jsonify({'success': True, 'message': 'Test offset saved successfully'})
-        else:
-            return jsonify({'success': False, 'message': 'Failed to save settings to file'})
+        # Save to file for persistence (debounced)
+        request_settings_save()
+        return jsonify({'success': True, 'message': 'Test offset saved successfully'})
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
@@ -706,23 +1078,16 @@ def get_test_offset():
 
 @app.route('/get_settings')
 def get_settings():
-    """Get current settings"""
-    return jsonify({
-        'host': app.config['HOST'],
-        'port': app.config['PORT'],
-        'debug': app.config['DEBUG'],
-        'default_delay1': app.config['DEFAULT_DELAY1'],
-        'default_delay2': app.config['DEFAULT_DELAY2'],
-        'min_total_time': app.config['MIN_TOTAL_TIME'],
-        'max_total_time': app.config['MAX_TOTAL_TIME'],
-        'audio_volume': app.config['AUDIO_VOLUME'],
-        'auto_refresh_interval': app.config['AUTO_REFRESH_INTERVAL'],
-        'countdown_update_interval': app.config['COUNTDOWN_UPDATE_INTERVAL'],
-        'relay_pin': app.config['RELAY_PIN'],
-        'relay_active_high': app.config['RELAY_ACTIVE_HIGH'],
-        'gate_open_duration': app.config['GATE_OPEN_DURATION'],
-        'beep_relay_alignment': app.config['BEEP_RELAY_ALIGNMENT']
-    })
+    """Get current settings (served from the cached body until the next change)"""
+    global _settings_response
+    body = _settings_response
+    if body is None:
+        generation = _settings_generation
+        body = app.json.dumps({key.lower(): app.config[key] for key in PERSISTED_SETTINGS})
+        with _save_lock:
+            if _settings_generation == generation:
+                _settings_response = body
+    return app.response_class(body, mimetype='application/json')
 
 @app.route('/relay_status')
 def relay_status():
@@ -736,33 +1101,39 @@ def relay_status():
 def save_settings():
     """Save settings"""
     try:
-        data = request.get_json()
-        
-        # Update config values
-        app.config['HOST'] = data.get('host', app.config['HOST'])
-        app.config['PORT'] = int(data.get('port', app.config['PORT']))
-        app.config['DEBUG'] = bool(data.get('debug', app.config['DEBUG']))
-        app.config['DEFAULT_DELAY1'] = float(data.get('default_delay1', app.config['DEFAULT_DELAY1']))
-        app.config['DEFAULT_DELAY2'] = float(data.get('default_delay2', app.config['DEFAULT_DELAY2']))
-        app.config['MIN_TOTAL_TIME'] = float(data.get('min_total_time', app.config['MIN_TOTAL_TIME']))
-        app.config['MAX_TOTAL_TIME'] = float(data.get('max_total_time', app.config['MAX_TOTAL_TIME']))
-        app.config['AUDIO_VOLUME'] = float(data.get('audio_volume', app.config['AUDIO_VOLUME']))
-        app.config['AUTO_REFRESH_INTERVAL'] = int(data.get('auto_refresh_interval', app.config['AUTO_REFRESH_INTERVAL']))
-        app.config['COUNTDOWN_UPDATE_INTERVAL'] = int(data.get('countdown_update_interval', app.config['COUNTDOWN_UPDATE_INTERVAL']))
-        app.config['RELAY_PIN'] = int(data.get('relay_pin', app.config['RELAY_PIN']))
-        app.config['RELAY_ACTIVE_HIGH'] = bool(data.get('relay_active_high', app.config['RELAY_ACTIVE_HIGH']))
-        app.config['GATE_OPEN_DURATION'] = float(data.get('gate_open_duration', app.config['GATE_OPEN_DURATION']))
-        app.config['BEEP_RELAY_ALIGNMENT'] = float(data.get('beep_relay_alignment', app.config['BEEP_RELAY_ALIGNMENT']))
-        
-        # Update pygame volume if audio is initialized
-        if pygame.mixer.get_init():
-            pygame.mixer.music.set_volume(app.config['AUDIO_VOLUME'])
-        
-        # Save settings to file for persistence
-        if save_settings_to_file():
-            return jsonify({'success': True, 'message': 'Settings saved successfully and persisted to file'})
-        else:
-            return jsonify({'success': True, 'message': 'Settings saved but failed to persist to file'})
+        data = get_request_data()
+        if data is None:
+            return jsonify({'success': False, 'message': 'Request body must be a JSON object'})
+        
+        # Coerce and validate every submitted value first so a bad field leaves the config untouched
+        # (str() and bool() accept any value, so those are passed through and type-checked in validate_settings)
+        updates = {key: data[key.lower()] if coerce in (str, bool) else coerce(data[key.lower()])
+                   for key, coerce in PERSISTED_SETTINGS.items()
+                   if key.lower() in data}
+        error = validate_settings({**{key: app.config[key] for key in PERSISTED_SETTINGS}, **updates})
+        if error:
+            return jsonify({'success': False, 'message': error})
+        
+        previous_buffer = app.config['AUDIO_BUFFER']
+        # The slot also covers a sequence that was accepted but not yet started by the worker
+        if updates.get('AUDIO_BUFFER', previous_buffer) != previous_buffer and sequence_slot.locked():
+            return jsonify({'success': False, 'message': 'Cannot change the audio buffer while a sequence is running'})
+        
+        app.config.update(updates)
+        
+        # Reopen the mixer if the buffer size changed, otherwise just update volume
+        message = 'Settings saved successfully'
+        if mixer_initialized():
+            if app.config['AUDIO_BUFFER'] != previous_buffer:
+                if not reinit_audio_async():
+                    # A sequence was accepted after the check above
+                    message = 'Settings saved; reinitialize audio after the sequence to apply the buffer size'
+            else:
+                apply_audio_volume()
+        
+        # Save settings to file for persistence (debounced)
+        request_settings_save()
+        return jsonify({'success': True, 'message': message})
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error saving settings: {str(e)}'})
@@ -770,25 +1141,31 @@ def save_settings():
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
+    status = audio_status
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'audio_initialized': pygame.mixer.get_init() is not None,
-        'audio_details': pygame.mixer.get_init() if pygame.mixer.get_init() else None
+        'audio_initialized': status['initialized'],
+        'audio_details': status['details']
     })
 
 @app.route('/reinit_audio', methods=['POST'])
 def reinit_audio():
-    """Manually reinitialize audio system"""
+    """Manually reinitialize audio system (in the background; poll /health for the result)"""
     try:
-        if init_audio():
-            return jsonify({'success': True, 'message': 'Audio system reinitialized successfully'})
-        else:
-            return jsonify({'success': False, 'message': 'Failed to reinitialize audio system'})
+        if not reinit_audio_async():
+            return jsonify({'success': False, 'message': 'Cannot reinitialize audio while a sequence is running'})
+        return jsonify({'success': True, 'pending': True, 'message': 'Audio reinitialization started'}), 202
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error reinitializing audio: {str(e)}'})
 
 if __name__ == '__main__':
+    # INFO by default; debug mode opts in to the per-event status trace
+    logging.basicConfig(level=logging.DEBUG if app.config['DEBUG'] else logging.INFO, format='%(message)s')
+    if not app.config['DEBUG']:
+        # Werkzeug logs every request at INFO, which means every status poll
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    
     # Initialize audio system
     if not init_audio():
         print("Warning: Audio system not initialized. Audio playback will not work.")
@@ -800,6 +1177,15 @@ if __name__ == '__main__':
     # Create audio directory if it doesn't exist
     os.makedirs(app.config['AUDIO_DIR'], exist_ok=True)
     
+    if app.config['LOCK_MEMORY']:
+        lock_process_memory()
+    
+    # Move everything allocated during startup out of the collector's reach
+    gc.freeze()
+    
+    # systemd stops the service with SIGTERM, which skips atexit; exit cleanly so pending settings are written
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
     print(f"Starting Flask app on {app.config['HOST']}:{app.config['PORT']}")
     print(f"Audio directory: {app.config['AUDIO_DIR']}")
     print("Place your beep audio files in the audio directory:")
@@ -807,8 +1193,15 @@ if __name__ == '__main__':
     print(f"  - {app.config['BEEP2_FILE']}")
     print(f"  - {app.config['BEEP3_FILE']}")
     
-    app.run(
-        host=app.config['HOST'],
-        port=app.config['PORT'],
-        debug=app.config['DEBUG']
-    ) 
\ No newline at end of file
+    if app.config['DEBUG'] or not WAITRESS_AVAILABLE:
+        app.run(
+            host=app.config['HOST'],
+            port=app.config['PORT'],
+            debug=app.config['DEBUG'],
+            threaded=True  # Status streams and polls must not queue behind each other
+        )
+    else:
+        # Fixed thread pool and no reloader polling the source files in the background
+        # Keep threads free beyond the status streams so stop requests are never queued
+        threads = max(app.config['SERVER_THREADS'], app.config['MAX_STATUS_STREAMS'] + 2)
+        serve(app, host=app.config['HOST'], port=app.config['PORT'], threads=threads)
@@ -1,4 +1,5 @@
 import os
+import sys
 
 class Config:
     """Configuration settings for the timing sequence application"""
@@ -6,7 +7,9 @@ class Config:
     # Server settings
     HOST = '0.0.0.0'  # Allow external connections
     PORT = 5000
-    DEBUG = False  # Set to True for development
+    DEBUG = False  # Set to True for development (uses the Flask dev server with reloader)
+    SERVER_THREADS = 8  # waitress worker threads; each open status stream holds one
+    MAX_STATUS_STREAMS = 4  # Open /sequence_events streams; extra clients poll instead so requests always get a thread
     
     # Audio settings
     AUDIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'audio')
@@ -26,6 +29,11 @@ class Config:
     
     # Audio playback settings
     AUDIO_VOLUME = 0.8  # Volume level (0.0 to 1.0)
+    # Mixer buffer in samples (1024 = ~23 ms at 44.1 kHz); smaller buffers underrun under ALSA/PulseAudio/PipeWire.
+    # The constant latency is absorbed by BEEP_RELAY_ALIGNMENT; larger sizes are tried if init fails
+    AUDIO_BUFFER = 512 if sys.platform == 'win32' else 1024
+    AUDIO_BACKEND = 'pygame'  # 'pygame' (SDL mixer) or 'aplay' (direct ALSA playback, Linux only)
+    AUDIO_DEVICE = 'default'  # ALSA device for the aplay backend (e.g. 'plughw:0' to skip PulseAudio/PipeWire)
     
     # Web interface settings
     AUTO_REFRESH_INTERVAL = 100  # milliseconds for status updates
@@ -34,5 +42,13 @@ class Config:
     # Relay control settings
     RELAY_PIN = 17      # BCM numbering
     RELAY_ACTIVE_HIGH = True
+    RELAY_PIN_FACTORY = None  # gpiozero pin backend: None (auto), 'lgpio', 'pigpio', 'rpigpio' or 'native'
     GATE_OPEN_DURATION = 1.0
     BEEP_RELAY_ALIGNMENT = 0.0  # Alignment offset in seconds (negative = beep early, positive = beep late)
+    
+    # Real-time scheduling for the sequence thread (Linux only, needs CAP_SYS_NICE)
+    SEQUENCE_RT_PRIORITY = 20  # SCHED_FIFO priority (1-99), 0 disables
+    SEQUENCE_CPU = None        # Optional CPU core to pin the sequence thread to (e.g. an isolcpus core)
+    RELAY_CPU = None           # Optional CPU core for the relay I/O thread (keep it off SEQUENCE_CPU)
+    LOCK_MEMORY = True         # mlockall() at startup so sequences never hit a page fault (needs CAP_IPC_LOCK)
+    THREAD_STACK_SIZE = 1024 * 1024  # Stack per thread the app starts (locked with LOCK_MEMORY); below 1 MiB deep recursion segfaults
@@ -3,6 +3,9 @@ class TimingSequenceController {
     constructor() {
         this.statusInterval = null;
         this.countdownInterval = null;
+        this.statusStream = null;
+        this.lastStatus = null;
+        this.lastStatusReceived = 0;
         this.isRunning = false;
         
         this.initializeElements();
@@ -228,8 +231,61 @@ class TimingSequenceController {
     }
     
     startStatusPolling() {
+        if (window.EventSource) {
+            this.startStatusStream();
+        } else {
+            this.fetchIntervalsAndStartPolling();
+        }
+    }
+
+    async startStatusStream() {
+        // Server pushes status on every phase change; the browser clock drives the countdown in between
+        this.statusStream = new EventSource('/sequence_events');
+        this.statusStream.onmessage = (event) => {
+            this.lastStatus = JSON.parse(event.data);
+            this.lastStatusReceived = performance.now();
+            this.applyStatus(this.lastStatus);
+        };
+        this.statusStream.onerror = () => {
+            // A refused stream (e.g. 503 when the server is full) is not retried; poll instead
+            if (this.statusStream.readyState === EventSource.CLOSED) {
+                this.fallBackToPolling();
+            }
+        };
+        
+        let interval = 50;
+        try {
+            const resp = await fetch('/get_settings');
+            const cfg = await resp.json();
+            interval = Math.max(20, parseInt(cfg.countdown_update_interval || 50));
+        } catch (e) {
+            // Keep the 50ms default if settings fetch fails
+        }
+        if (this.statusStream === null) {
+            return;  // Already fell back to polling
+        }
+        this.statusInterval = setInterval(() => this.extrapolateStatus(), interval);
+    }
+    
+    fallBackToPolling() {
+        this.statusStream.close();
+        this.statusStream = null;
+        clearInterval(this.statusInterval);
         this.fetchIntervalsAndStartPolling();
     }
+    
+    extrapolateStatus() {
+        const status = this.lastStatus;
+        if (!status || !status.running) {
+            return;
+        }
+        const elapsed = (performance.now() - this.lastStatusReceived) / 1000;
+        this.applyStatus({
+            ...status,
+            current_time: status.current_time + elapsed,
+            countdown: Math.max(0, status.countdown - elapsed)
+        });
+    }
 
     async fetchIntervalsAndStartPolling() {
         try {
@@ -238,13 +294,11 @@ class TimingSequenceController {
             const interval = Math.max(50, parseInt(cfg.auto_refresh_interval || 100));
             this.statusInterval = setInterval(() => {
                 this.updateSequenceStatus();
-                this.updateRelayStatus();
             }, interval);
         } catch (e) {
             // Fallback to 100ms if settings fetch fails
             this.statusInterval = setInterval(() => {
                 this.updateSequenceStatus();
-                this.updateRelayStatus();
             }, 100);
         }
     }
@@ -253,27 +307,31 @@ class TimingSequenceController {
         try {
             const response = await fetch('/sequence_status');
             const status = await response.json();
-            
-            if (status.running) {
-                this.isRunning = true;
-                this.updateStatusDisplay(status.phase);
-                this.updateCountdown(status);
-                this.updateProgress(status);
-                this.updateStatusIndicators(status);
-            } else {
-                if (this.isRunning) {
-                    this.isRunning = false;
-                    this.updateStatusDisplay('idle');
-                    this.resetStatusIndicators();
-                    this.resetCountdown();
-                    this.hideStopButton();
-                }
-            }
+            this.applyStatus(status);
         } catch (error) {
             console.error('Error updating status:', error);
         }
     }
     
+    applyStatus(status) {
+        if (status.running) {
+            this.isRunning = true;
+            this.updateStatusDisplay(status.phase);
+            this.updateCountdown(status);
+            this.updateProgress(status);
+            this.updateStatusIndicators(status);
+        } else {
+            if (this.isRunning) {
+                this.isRunning = false;
+                this.updateStatusDisplay('idle');
+                this.resetStatusIndicators();
+                this.resetCountdown();
+                this.hideStopButton();
+            }
+        }
+        this.updateRelayStatus(status);
+    }
+    
     updateStatusDisplay(phase) {
         // Remove all status classes
         this.statusDisplay.classList.remove('status-idle', 'status-running', 'status-gate-open');
@@ -342,18 +400,12 @@ class TimingSequenceController {
         }
     }
     
-    async updateRelayStatus() {
-        try {
-            // Prefer using sequence status which now includes relay_active to reduce calls
-            const response = await fetch('/sequence_status');
-            const status = await response.json();
-            if (status.relay_active) {
-                this.relayIndicator.classList.add('active');
-            } else {
-                this.relayIndicator.classList.remove('active');
-            }
-        } catch (error) {
-            console.error('Error updating relay status:', error);
+    updateRelayStatus(status) {
+        // Sequence status includes relay_active, so no separate request is needed
+        if (status.relay_active) {
+            this.relayIndicator.classList.add('active');
+        } else {
+            this.relayIndicator.classList.remove('active');
         }
     }
     